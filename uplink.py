@@ -7,6 +7,9 @@ Run in Python 3
 Install requests library, via macOS terminal:
 pip3 install requests
 
+Optionally, install orjson too, for faster parsing of API responses:
+pip3 install orjson
+
 login.py has these two lines, with the API key from your Dashboard profile (upper-right email login > API access), and organization ID to call (https://dashboard.meraki.com/api/v0/organizations); separated into different file for security.
 api_key = '[API_KEY]'
 org_id = '[ORG_ID]'
@@ -34,16 +37,31 @@ So I moved all the line of code into a function that managed some basic, HTTP/co
 After that it returns an empty json array.
 - to some fields and their formats (refs.: ['name'] and str() function)
 - added firmware and geolocation, to better identify each device
+
+EDIT 2026-10-15
+- devices are queried several at a time, each worker thread with its own session
+- failed web requests are still attempted 3 times, but waiting longer and longer between attempts (with some random jitter),
+and honoring Meraki's Retry-After when the rate limit is exceeded.
+Errors that retrying can't fix (like a wrong API key) are not retried, and when all attempts fail the last error is raised.
 '''
 
 import csv
 import datetime
-import json
+import random
 import requests
 import sys
+import threading
 import time
+# orjson parses the API responses faster, straight from bytes; the standard json module is used when it's not installed.
+try:
+  from orjson import loads as json_loads
+except ImportError:
+  from json import loads as json_loads
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 #FIXME20220930 'excepts' does not work with my Python 3.x #from excepts import MalformedRequest, StatusUnknown, InternalError
-from requests.exceptions import ConnectionError
+from requests.exceptions import ConnectionError, HTTPError, Timeout
 from http.client import RemoteDisconnected
 from urllib3.exceptions import ProtocolError
 from http.client import HTTPException
@@ -59,24 +77,205 @@ class csvquoting(csv.Dialect):
   lineterminator = "\r\n"
   skipinitialspace = True
 
-def get_network(network_id, networks):
-  return [element for element in networks if network_id == element['id']][0]
+# CSV files are opened with newline='', as the csv module requires: line endings are already set by csvquoting.lineterminator.
+# The large buffer means rows are flushed to disk in big chunks rather than every few rows.
+CSV_BUFFER_SIZE = 1024 * 1024
+
+# Columns of the two CSV files
+APPLIANCE_FIELDNAMES = ['TimeZone', 'Network', 'Device', 'Serial', 'MAC', 'Model', 'firmware', 'geolocation', 'WAN1 Status', 'WAN1 IP', 'WAN1 Gateway', 'WAN1 Public IP', 'WAN1 DNS', 'WAN1 Static', 'WAN2 Status', 'WAN2 IP', 'WAN2 Gateway', 'WAN2 Public IP', 'WAN2 DNS', 'WAN2 Static', 'Cellular Status', 'Cellular IP', 'Cellular Provider', 'Cellular Public IP', 'Cellular Model', 'Cellular Connection', 'Performance']
+DEVICE_FIELDNAMES = ['TimeZone', 'Network', 'Device', 'Serial', 'MAC', 'Model', 'Status', 'IP', 'Gateway', 'Public IP', 'DNS', 'VLAN', 'Static']
+
+# How many devices are queried at the same time.
+# Meraki allows about 5 API calls per second per organization, so there is no point in going much higher.
+MAX_WORKERS = 5
+
+# How many times an API call is attempted, and the longest wait (in seconds) between two attempts.
+MAX_RETRIES = 3
+MAX_DELAY = 30
+# Seconds to wait for the connection to open, and then for the response: a stalled call is retried instead of blocking forever.
+TIMEOUT = (5, 30)
+# Items per page for the organization-wide lists: 1000 is the largest page size all of them allow.
+PAGE_SIZE = 1000
+
+# Model prefixes of appliances (MX, Z1, Z3, vMX100): they go in the appliances CSV, with their WAN uplinks.
+APPLIANCE_PREFIXES = frozenset({'MX', 'Z1', 'Z3', 'vM'})
+
+# Progress and warning messages come from several worker threads at the same time:
+# a print() is not a single write, so they are printed under a lock to keep each message on its own line.
+print_lock = threading.Lock()
 
-def jsonload(path):
-  # an empty string means there was an error, because we always expect to receive a JSON structure as a response.
-  # (please note a minimal JSON structure like {} or [] still is represented by 2 characters, not 0)
-  jsondata = ''
-  # retry 3 times, then fail
-  retries = 3;
-  while not 0 < len(jsondata) and 0 < retries:
+def log(message, file=None):
+  with print_lock:
+    print(message, file=file or sys.stdout)
+
+# Holds what is needed to call the Dashboard API, and is passed explicitly to jsonload().
+# Each worker thread keeps its own requests session (and so its own keep-alive connection to Meraki).
+# The API key headers are set once on the session, instead of being passed to every call.
+class merakiclient:
+  def __init__(self, api_key):
+    self.headers = {'X-Cisco-Meraki-API-Key': api_key, 'Content-Type': 'application/json'}
+    self.thread_data = threading.local()
+
+  def session(self):
+    if not hasattr(self.thread_data, 'session'):
+      session = requests.session()
+      session.headers.update(self.headers)
+      self.thread_data.session = session
+    return self.thread_data.session
+
+# Like executor.map(), but only keeps up to MAX_WORKERS * 4 calls submitted at any time,
+# instead of queuing one for every item up front: memory use does not grow with the number of devices.
+# Results are still yielded in the same order as items.
+def map_bounded(executor, function, items):
+  pending = deque()
+  for item in items:
+    if len(pending) >= MAX_WORKERS * 4:
+      yield pending.popleft().result()
+    pending.append(executor.submit(function, item))
+  while pending:
+    yield pending.popleft().result()
+
+# Seconds to wait before retrying a failed call: it doubles at each attempt, with up to +50% random jitter,
+# so that the worker threads don't all retry at the very same moment.
+def backoff(attempt):
+  return min(MAX_DELAY, 1.0 * 2 ** attempt * (1 + random.random() * 0.5))
+
+# Calls the API and returns the successful response.
+def apiget(client, url):
+  # retry MAX_RETRIES times, waiting longer and longer, then fail
+  for attempt in range(MAX_RETRIES):
+    delay = backoff(attempt)
     try:
-      # I decided to bring the base URL here, to make the code more compact, hence more readable.
-      jsondata = session.get('https://api.meraki.com/api/v0/' + path, headers=headers).text
-    except (ConnectionError, RemoteDisconnected, ProtocolError, HTTPException) as e:
+      response = client.session().get(url, timeout=TIMEOUT)
+    except (ConnectionError, Timeout, RemoteDisconnected, ProtocolError, HTTPException) as e:
       #FIXME20220930#except (InternalError, StatusUnknown, ConnectionError, RemoteDisconnected, ProtocolError, HTTPException) as e:
-      time.sleep(1)
-    retries -= 1
-  return json.loads(jsondata)
+      error = e
+    else:
+      if response.status_code == 429:
+        # rate limit exceeded: Meraki tells us how long to wait, in seconds.
+        # If the header is missing or isn't a number (e.g. an HTTP date), keep the backoff delay.
+        try:
+          delay = max(0.0, min(MAX_DELAY, float(response.headers['Retry-After'])))
+        except (KeyError, ValueError):
+          pass
+      elif response.status_code < 500:
+        # success, or an error (wrong API key, unknown device...) that won't go away by retrying
+        response.raise_for_status()
+        return response
+      error = HTTPError(f'{response.status_code} {response.reason} for {url}', response=response)
+    if attempt < MAX_RETRIES - 1:
+      time.sleep(delay)
+  raise error
+
+def jsonload(client, path):
+  # I decided to bring the base URL here, to make the code more compact, hence more readable.
+  return json_loads(apiget(client, f'https://api.meraki.com/api/v0/{path}').content)
+
+# For organization-wide lists, which Meraki returns one page at a time:
+# asks for the largest pages allowed, and follows the 'next' links until the last page.
+def jsonload_pages(client, path):
+  items = []
+  url = f'https://api.meraki.com/api/v0/{path}?perPage={PAGE_SIZE}'
+  while url:
+    response = apiget(client, url)
+    items.extend(json_loads(response.content))
+    url = response.links.get('next', {}).get('url')
+  return items
+
+# Name, firmware and location of a device.
+# A device claimed or moved while the script is running may be missing: its serial is used as name, and the rest left blank.
+def get_device_info(devinfo_by_serial, serial):
+  device_info = devinfo_by_serial.get(serial)
+  if device_info is None:
+    log('WARNING: no details found for device ' + serial + ', firmware and geolocation left blank', file=sys.stderr)
+    device_info = {'serial': serial, 'firmware': '', 'lat': None, 'lng': None}
+  return device_info
+
+# Collects the info of a single appliance and returns its CSV line.
+# It runs in a worker thread (see MAX_WORKERS), so it must not touch the CSV writer.
+# Everything it needs is passed in: the client, plus networks and device details indexed by ID/serial.
+def fetch_appliance(client, networks_by_id, devinfo_by_serial, appliance):
+  network = networks_by_id[appliance['networkId']]
+  network_name = network['name']
+  device_info = get_device_info(devinfo_by_serial, appliance['serial'])
+  # sometimes I encountered some devices WITHOUT a name (or with an empty one),
+  # and this produced an error when you access ['name'].
+  # So i decided to use ['serial'] as fallback.
+  device_name = device_info.get('name') or device_info['serial']
+  try:
+    perfscore = jsonload(client, f"networks/{appliance['networkId']}/devices/{appliance['serial']}/performance")['perfScore']
+  except:
+    perfscore = None
+  log('Found appliance ' + device_name + ' in network ' + network_name)
+  uplinks = jsonload(client, f"networks/{appliance['networkId']}/devices/{appliance['serial']}/uplink")
+  # missing interfaces and fields are left blank in the CSV
+  uplinks_by_iface = {uplink['interface']: uplink for uplink in uplinks}
+  wan1, wan2, cellular = uplinks_by_iface.get('WAN 1', {}), uplinks_by_iface.get('WAN 2', {}), uplinks_by_iface.get('Cellular', {})
+  csvline = {
+    'TimeZone':str(network['timeZone'])
+    , 'Network': network_name
+    , 'Device': device_name
+    , 'Serial': appliance['serial']
+    , 'MAC': appliance['mac']
+    , 'Model': appliance['model']
+    , 'firmware': device_info['firmware']
+    , 'geolocation': f"https://www.google.com/maps/@{device_info['lat']},{device_info['lng']},15z" if device_info['lat'] is not None else ''
+    , 'WAN1 Status': str(wan1.get('status', ''))
+    , 'WAN1 IP': str(wan1.get('ip', ''))
+    , 'WAN1 Gateway': str(wan1.get('gateway', ''))
+    , 'WAN1 Public IP': str(wan1.get('publicIp', ''))
+    , 'WAN1 DNS': str(wan1.get('dns', ''))
+    , 'WAN1 Static': str(wan1.get('usingStaticIp', ''))
+    , 'WAN2 Status': str(wan2.get('status', ''))
+    , 'WAN2 IP': str(wan2.get('ip', ''))
+    , 'WAN2 Gateway': str(wan2.get('gateway', ''))
+    , 'WAN2 Public IP': str(wan2.get('publicIp', ''))
+    , 'WAN2 DNS': str(wan2.get('dns', ''))
+    , 'WAN2 Static': str(wan2.get('usingStaticIp', ''))
+    , 'Cellular Status': str(cellular.get('status', ''))
+    , 'Cellular IP': str(cellular.get('ip', ''))
+    , 'Cellular Provider': str(cellular.get('provider', ''))
+    , 'Cellular Public IP': str(cellular.get('publicIp', ''))
+    , 'Cellular Model': str(cellular.get('model', ''))
+    , 'Cellular Connection': str(cellular.get('connectionType', ''))
+  }
+  if perfscore != None:
+    csvline['Performance'] = perfscore
+  return csvline
+
+# Same as fetch_appliance(), for all other devices.
+# Returns None for devices without an uplink, which are skipped.
+def fetch_device(client, networks_by_id, devinfo_by_serial, device):
+  network = networks_by_id[device['networkId']]
+  network_name = network['name']
+  device_info = get_device_info(devinfo_by_serial, device['serial'])
+  device_name = device_info.get('name') or device_info['serial']
+  log('Found device ' + device_name + ' in network ' + network_name)
+  uplink = jsonload(client, f"networks/{device['networkId']}/devices/{device['serial']}/uplink")
+  
+  # Blank uplink for devices that are down or meshed APs
+  if uplink == []:
+    return None
+  # All other devices have single uplink
+  else:
+    uplink = uplink[0]
+  csvline = {
+    'TimeZone':str(network['timeZone'])
+    , 'Network': network_name
+    , 'Device': device_name
+    , 'Serial': device['serial']
+    , 'MAC': device['mac']
+    , 'Model': device['model']
+    , 'Status': str(uplink.get('status', ''))
+    , 'IP': str(uplink.get('ip', ''))
+    , 'Gateway': str(uplink.get('gateway', ''))
+    , 'Public IP': str(uplink.get('publicIp', ''))
+    , 'DNS': str(uplink.get('dns', ''))
+    , 'VLAN': str(uplink.get('vlan', ''))
+    , 'Static': str(uplink.get('usingStaticIp', ''))
+  }
+  return csvline
+
 
 if __name__ == '__main__':
   # Import API key and org ID from login.py
@@ -89,136 +288,43 @@ if __name__ == '__main__':
 
 
   # Find all appliance networks (MX, Z1, Z3, vMX100)
-  session = requests.session()
-  headers = {'X-Cisco-Meraki-API-Key': API_KEY, 'Content-Type': 'application/json'}
+  client = merakiclient(API_KEY)
   try:
-    name = jsonload('organizations/' + ORG_ID)['name']
+    name = jsonload(client, f'organizations/{ORG_ID}')['name']
   except:
     sys.exit('Incorrect API key or org ID, as no valid data returned')
-  networks = jsonload('organizations/' + ORG_ID + '/networks')
-  inventory = jsonload('organizations/' + ORG_ID + '/inventory')
-  appliances = [device for device in inventory if device['model'][:2] in ('MX', 'Z1', 'Z3', 'vM') and device['networkId'] is not None]
-  devices = [device for device in inventory if device not in appliances and device['networkId'] is not None]
+  networks = jsonload(client, f'organizations/{ORG_ID}/networks')
+  # indexed by ID, so there is no need to scan the whole list for every device
+  networks_by_id = {network['id']: network for network in networks}
+  inventory = jsonload(client, f'organizations/{ORG_ID}/inventory')
+  # name, firmware and location of every device, with a single (paginated) call instead of one per device
+  devinfo_by_serial = {device['serial']: device for device in jsonload_pages(client, f'organizations/{ORG_ID}/devices')}
+  appliances = [device for device in inventory if device['model'][:2] in APPLIANCE_PREFIXES and device['networkId'] is not None]
+  appliance_serials = {device['serial'] for device in appliances}
+  devices = [device for device in inventory if device['serial'] not in appliance_serials and device['networkId'] is not None]
 
 
   # Output CSV of appliances' info
-  today = datetime.date.today()
-  csv_file1 = open(name + ' appliances - ' + str(today) + '.csv', 'w', encoding='utf-8')
-  fieldnames = ['TimeZone', 'Network', 'Device', 'Serial', 'MAC', 'Model', 'firmware', 'geolocation', 'WAN1 Status', 'WAN1 IP', 'WAN1 Gateway', 'WAN1 Public IP', 'WAN1 DNS', 'WAN1 Static', 'WAN2 Status', 'WAN2 IP', 'WAN2 Gateway', 'WAN2 Public IP', 'WAN2 DNS', 'WAN2 Static', 'Cellular Status', 'Cellular IP', 'Cellular Provider', 'Cellular Public IP', 'Cellular Model', 'Cellular Connection', 'Performance']
-  writer = csv.DictWriter(csv_file1, fieldnames=fieldnames, restval='', dialect=csvquoting)
-  writer.writeheader()
-
-  # Iterate through appliances
-  for appliance in appliances:
-    network = get_network(appliance['networkId'], networks)
-    network_name = network['name']
-    print('Looking into network ' + network_name)
-    device_info = jsonload('networks/' + appliance['networkId'] + '/devices/' + appliance['serial'])
-    # sometimes I encountered some devices WITHOUT a name,
-    # and this produced an error when you access ['name'].
-    # So i decided to use ['serial'] as fallback.
-    if 'name' in device_info.keys():
-      device_name = device_info['name']
-    else:
-      device_name = device_info['serial']
-    try:
-      perfscore = jsonload('networks/' + appliance['networkId'] + '/devices/' + appliance['serial'] + '/performance')['perfScore']
-    except:
-      perfscore = None
-    print('Found appliance ' + device_name)
-    uplinks_info = dict.fromkeys(['WAN1', 'WAN2', 'Cellular'])
-    uplinks_info['WAN1'] = dict.fromkeys(['interface', 'status', 'ip', 'gateway', 'publicIp', 'dns', 'usingStaticIp'])
-    uplinks_info['WAN2'] = dict.fromkeys(['interface', 'status', 'ip', 'gateway', 'publicIp', 'dns', 'usingStaticIp'])
-    uplinks_info['Cellular'] = dict.fromkeys(['interface', 'status', 'ip', 'provider', 'publicIp', 'model', 'connectionType'])
-    uplinks = jsonload('networks/' + appliance['networkId'] + '/devices/' + appliance['serial'] + '/uplink')
-    for uplink in uplinks:
-      if uplink['interface'] == 'WAN 1':
-        for key in uplink.keys():
-          uplinks_info['WAN1'][key] = str(uplink[key])
-      elif uplink['interface'] == 'WAN 2':
-        for key in uplink.keys():
-          uplinks_info['WAN2'][key] = str(uplink[key])
-      elif uplink['interface'] == 'Cellular':
-        for key in uplink.keys():
-          uplinks_info['Cellular'][key] = str(uplink[key])
-    csvline = {
-      'TimeZone':str(network['timeZone'])
-      , 'Network': network_name
-      , 'Device': device_name
-      , 'Serial': appliance['serial']
-      , 'MAC': appliance['mac']
-      , 'Model': appliance['model']
-      , 'firmware': device_info['firmware']
-      , 'geolocation': "https://www.google.com/maps/@" + str(device_info['lat']) + "," + str(device_info['lng']) + ",15z"
-      , 'WAN1 Status': uplinks_info['WAN1']['status']
-      , 'WAN1 IP': uplinks_info['WAN1']['ip']
-      , 'WAN1 Gateway': uplinks_info['WAN1']['gateway']
-      , 'WAN1 Public IP': uplinks_info['WAN1']['publicIp']
-      , 'WAN1 DNS': uplinks_info['WAN1']['dns']
-      , 'WAN1 Static': uplinks_info['WAN1']['usingStaticIp']
-      , 'WAN2 Status': uplinks_info['WAN2']['status']
-      , 'WAN2 IP': uplinks_info['WAN2']['ip']
-      , 'WAN2 Gateway': uplinks_info['WAN2']['gateway']
-      , 'WAN2 Public IP': uplinks_info['WAN2']['publicIp']
-      , 'WAN2 DNS': uplinks_info['WAN2']['dns']
-      , 'WAN2 Static': uplinks_info['WAN2']['usingStaticIp']
-      , 'Cellular Status': uplinks_info['Cellular']['status']
-      , 'Cellular IP': uplinks_info['Cellular']['ip']
-      , 'Cellular Provider': uplinks_info['Cellular']['provider']
-      , 'Cellular Public IP': uplinks_info['Cellular']['publicIp']
-      , 'Cellular Model': uplinks_info['Cellular']['model']
-      , 'Cellular Connection': uplinks_info['Cellular']['connectionType']
-    }
-    if perfscore != None:
-      csvline['Performance'] = perfscore
-    writer.writerow(csvline)
-  csv_file1.close()
+  today = str(datetime.date.today())
+  # the file is closed (and every line already written is saved) even if something goes wrong halfway
+  with open(f'{name} appliances - {today}.csv', 'w', encoding='utf-8', newline='', buffering=CSV_BUFFER_SIZE) as csv_file1:
+    writer = csv.DictWriter(csv_file1, fieldnames=APPLIANCE_FIELDNAMES, restval='', dialect=csvquoting)
+    writer.writeheader()
+
+    # Iterate through appliances, fetching several of them at the same time:
+    # the script spends nearly all its time waiting for api.meraki.com, not computing.
+    # writerows() writes the lines as soon as they are ready, in the same order as the inventory.
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+      writer.writerows(map_bounded(executor, partial(fetch_appliance, client, networks_by_id, devinfo_by_serial), appliances))
 
 
   # PLEASE REFER TO ABOVE COMMENTS FOR appliances for an explanation of code below: there are only minor differences.
 
   # Output CSV of all other devices' info
-  csv_file2 = open(name + ' other devices - ' + str(today) + '.csv', 'w', encoding='utf-8')
-  fieldnames = ['TimeZone', 'Network', 'Device', 'Serial', 'MAC', 'Model', 'Status', 'IP', 'Gateway', 'Public IP', 'DNS', 'VLAN', 'Static']
-  writer = csv.DictWriter(csv_file2, fieldnames=fieldnames, restval='', dialect=csvquoting)
-  writer.writeheader()
-
-  # Iterate through all other devices
-  for device in devices:
-    network = get_network(device['networkId'], networks)
-    network_name = network['name']
-    print('Looking into network ' + network_name)
-    device_info = jsonload('networks/' + device['networkId'] + '/devices/' + device['serial'])
-    if 'name' in device_info.keys():
-      device_name = device_info['name']
-    else:
-      device_name = device_info['serial']
-    print('Found device ' + device_name)
-    uplink_info = dict.fromkeys(['interface', 'status', 'ip', 'gateway', 'publicIp', 'dns', 'vlan', 'usingStaticIp'])
-    uplink = jsonload('networks/' + device['networkId'] + '/devices/' + device['serial'] + '/uplink')
-    
-    # Blank uplink for devices that are down or meshed APs
-    if uplink == []:
-      continue
-    # All other devices have single uplink
-    else:
-      uplink = uplink[0]
-    for key in uplink.keys():
-      uplink_info[key] = str(uplink[key])
-    csvline = {
-      'TimeZone':str(network['timeZone'])
-      , 'Network': network_name
-      , 'Device': device_name
-      , 'Serial': device['serial']
-      , 'MAC': device['mac']
-      , 'Model': device['model']
-      , 'Status': uplink_info['status']
-      , 'IP': uplink_info['ip']
-      , 'Gateway': uplink_info['gateway']
-      , 'Public IP': uplink_info['publicIp']
-      , 'DNS': uplink_info['dns']
-      , 'VLAN': uplink_info['vlan']
-      , 'Static': uplink_info['usingStaticIp']
-    }
-    writer.writerow(csvline)
-  csv_file2.close()
+  with open(f'{name} other devices - {today}.csv', 'w', encoding='utf-8', newline='', buffering=CSV_BUFFER_SIZE) as csv_file2:
+    writer = csv.DictWriter(csv_file2, fieldnames=DEVICE_FIELDNAMES, restval='', dialect=csvquoting)
+    writer.writeheader()
+
+    # Iterate through all other devices
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+      writer.writerows(csvline for csvline in map_bounded(executor, partial(fetch_device, client, networks_by_id, devinfo_by_serial), devices) if csvline is not None)